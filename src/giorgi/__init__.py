@@ -2,3 +2,9 @@ from .base_quantities import *
 from .derived_quantities import *
 from .additional_units import *
 from .currencies import *
+from .batches import *
+from .indices import *
+from .checking import *
+from .schemas import *
+from .caching import *
+from .expressions import *
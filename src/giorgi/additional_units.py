@@ -12,7 +12,7 @@ import math
 from giorgi.prefices import BINARY_PREFICES, DECIMAL_PREFICES
 from giorgi.units import Unit
 from .base_quantities import Length, Time, Mass, Temperature, Information, PlainAngle
-from .derived_quantities import Area, Volume, Pressure, Energy, Conductance
+from .derived_quantities import Area, Volume, Pressure, Energy, Conductance, VolumetricFlowRate
 
 
 # Geometric quantities
@@ -85,8 +85,11 @@ Unit(quantity=Temperature, symbol='°R', scale=5/9, name='rankine')
 Unit.create_set(quantity=Pressure, symbol='bar', scale=1e5, name='bar')
 Unit(quantity=Pressure, symbol='atm', scale=1.01325e5, name='atmosphere')
 Unit(quantity=Pressure, symbol='psi', scale=6894.757, name='pound-force per square inch')
-Unit(quantity=Energy, symbol='Wh', scale=3600, name='watt-hour')
+Unit.create_set(quantity=Energy, symbol='Wh', scale=3600, name='watt-hour')
 Unit.create_set(quantity=Energy, symbol='eV', scale=1.602176634e-19, name='electron-volt')
+Unit(quantity=VolumetricFlowRate, symbol='l/s', scale=1e-3, name='litre per second')
+Unit(quantity=VolumetricFlowRate, symbol='l/min', scale=1e-3/60, name='litre per minute')
+Unit(quantity=VolumetricFlowRate, symbol='l/h', scale=1e-3/3600, name='litre per hour')
 
 
 # Electrical quantities
@@ -0,0 +1,241 @@
+""" giorgi - batches
+
+This module contains a container for batches of quantities of a single quantity type,
+as well as functions working on such batches as a whole.
+
+Values in a batch are stored as floats in the main unit of the quantity type, so that
+operations on the batch only need to resolve units once instead of once per value.
+
+author: Bram Rooseleer
+copyright: Bram Rooseleer
+"""
+
+from array import array
+from collections import defaultdict, deque
+from concurrent.futures import Executor
+from functools import partial
+from itertools import islice
+import math
+import os
+from typing import Any, Callable, Iterable, Iterator, Optional, Self, Sequence
+
+from giorgi.quantities import Quantity, QuantityType
+
+
+__all__ = ['DEFAULT_CHUNK_SIZE', 'QuantityArray', 'format_many', 'UnknownUnitsError', 'normalize']
+
+
+DEFAULT_CHUNK_SIZE: int = 65536
+"""The number of values handled per chunk when work is spread over an executor."""
+
+
+def _default_in_flight() -> int:
+    """Return the default number of chunks in flight on an executor: twice the number of CPUs."""
+    return 2*(os.cpu_count() or 1)
+
+
+def _map_bounded(executor: Executor, function: Callable, items: Iterable, in_flight: int) -> Iterator[Any]:
+    """Yield the results of the function for the items, in order, calculated by the given executor.
+
+    Contrary to Executor.map, at most in_flight items are submitted at any time, a new item is only submitted
+    after a result has been taken. This bounds the memory used for pending items and results.
+    """
+    items = iter(items)
+    futures = deque(executor.submit(function, item) for item in islice(items, in_flight))
+    while futures:
+        result = futures.popleft().result()
+        for item in islice(items, 1):
+            futures.append(executor.submit(function, item))
+        yield result
+
+
+class QuantityArray:
+    """A batch of quantities of the same quantity type.
+
+    The values are stored in a float64 array, expressed in the main unit of the quantity type.
+    Quantity instances are only created when individual values are accessed.
+
+    E.g.
+    QuantityArray(Length, [1, 2, 3], 'km')[1] -> 2000.000 m
+    """
+    def __init__(self, quantity_type: QuantityType, values: Iterable[float] = (), symbol_or_name=None):
+        """Create a batch of quantities of the given type from values expressed in the given unit."""
+        unit = quantity_type.unit(symbol_or_name)
+        self.quantity_type = quantity_type
+        if unit.scale == 1 and unit.bias == 0:
+            self.values = array('d', values)
+        else:
+            scale, bias = unit.scale, unit.bias
+            self.values = array('d', [(value + bias)*scale for value in values])
+
+    @classmethod
+    def from_quantities(cls, quantities: Iterable[Quantity], quantity_type: Optional[QuantityType] = None) -> Self:
+        """Create a batch from quantity instances, which should all be of the same type.
+
+        The quantity type is only needed when the given quantities can be empty.
+        Values of a QuantityArray or QuantityIndex are copied.
+        """
+        quantity_type, values = _main_values(quantities, quantity_type)
+        if isinstance(quantities, _batch_types()):
+            values = array('d', values)
+        if quantity_type is None:
+            raise ValueError("The quantity type cannot be derived from an empty batch")
+        return cls._from_main_values(quantity_type, values)
+
+    @classmethod
+    def _from_main_values(cls, quantity_type: QuantityType, values: array) -> Self:
+        """Create a batch that wraps the given array of values in the main unit, without copying it."""
+        batch = cls.__new__(cls)
+        batch.quantity_type = quantity_type
+        batch.values = values
+        return batch
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __getitem__(self, index: int | slice) -> Quantity | Self:
+        """Return the quantity at the given index, or a new batch for a slice."""
+        if isinstance(index, slice):
+            return self._from_main_values(self.quantity_type, self.values[index])
+        return self.quantity_type(self.values[index])
+
+    def __iter__(self) -> Iterator[Quantity]:
+        quantity_type = self.quantity_type
+        return (quantity_type(value) for value in self.values)
+
+    def __repr__(self) -> str:
+        """Return a representation of this batch."""
+        return f"QuantityArray({self.quantity_type}, {self.values.tolist()})"
+
+    def in_unit(self, symbol_or_name) -> array:
+        """Return the values of this batch expressed in the unit with the given name or symbol."""
+        unit = self.quantity_type.unit(symbol_or_name)
+        scale, bias = unit.scale, unit.bias
+        return array('d', [value/scale - bias for value in self.values])
+
+    def format(self, symbol_or_name=None, float_fmt: str = '.3f', **kwargs) -> list[str] | str:
+        """Return string representations of the values in this batch. See format_many."""
+        return format_many(self, symbol_or_name, float_fmt, **kwargs)
+
+
+def _batch_types() -> tuple[type, ...]:
+    """Return the classes of batches that store their values in an array in the main unit."""
+    from giorgi.indices import QuantityIndex
+    return QuantityArray, QuantityIndex
+
+
+def _main_values(quantities: Iterable[Quantity], quantity_type: Optional[QuantityType] = None) -> tuple[Optional[QuantityType], array]:
+    """Return the quantity type and an array with the values in the main unit of the given quantities.
+
+    For a QuantityArray or QuantityIndex, its own array is returned without copying it.
+    """
+    if isinstance(quantities, _batch_types()):
+        if quantity_type is not None and quantities.quantity_type is not quantity_type:
+            raise TypeError(f"Expected quantities of type {quantity_type}, not {quantities.quantity_type}")
+        return quantities.quantity_type, quantities.values
+    values = array('d')
+    for quantity in quantities:
+        if quantity_type is None:
+            quantity_type = type(quantity)
+        elif type(quantity) is not quantity_type:
+            raise TypeError("All quantities in a batch should be of the same type")
+        values.append(quantity.value)
+    return quantity_type, values
+
+
+def _format_chunk(template: str, scale: float, bias: float, values: array) -> list[str]:
+    """Return the formatted strings for a chunk of values in the main unit."""
+    return [template.format(value/scale - bias) for value in values]
+
+
+def format_many(
+        values: Iterable[Quantity],
+        symbol_or_name=None,
+        float_fmt: str = '.3f',
+        *,
+        sep: Optional[str] = None,
+        executor: Optional[Executor] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        in_flight: Optional[int] = None,
+    ) -> list[str] | str:
+    """Return string representations of a batch of quantities of the same type.
+
+    The result is the same as calling Quantity.to_string for every value, but the unit and the format
+    are only resolved once for the whole batch:
+    format_many([Energy(3600), Energy(7200)], 'Wh', '.1f') -> ['1.0 Wh', '2.0 Wh']
+
+    Arguments:
+        values: a batch (e.g. a QuantityArray or QuantityIndex) or an iterable of quantities of the same type
+        symbol_or_name: the unit to express the values in, the main unit if None
+        float_fmt: the float format, as defined by the formatting mini-language
+        sep: if given, the strings are joined with this separator and a single string is returned
+        executor: if given, the values are formatted in chunks which are spread over this executor
+            (e.g. a ThreadPoolExecutor or ProcessPoolExecutor), with a bounded number of chunks in flight
+        chunk_size: the number of values per chunk when an executor is used
+        in_flight: the maximum number of chunks submitted to the executor at any time,
+            twice the number of CPUs if None
+    """
+    quantity_type, main_values = _main_values(values)
+    if quantity_type is None:
+        strings = []
+    else:
+        unit = quantity_type.unit(symbol_or_name)
+        symbol = unit.symbol.replace('{', '{{').replace('}', '}}')
+        template = f"{{:{float_fmt}}}{'' if unit.no_space_before_unit else ' '}{symbol}"
+        if executor is None:
+            strings = _format_chunk(template, unit.scale, unit.bias, main_values)
+        else:
+            chunks = (main_values[start:start + chunk_size] for start in range(0, len(main_values), chunk_size))
+            strings = []
+            for chunk_strings in _map_bounded(executor, partial(_format_chunk, template, unit.scale, unit.bias), chunks, in_flight or _default_in_flight()):
+                strings.extend(chunk_strings)
+    if sep is not None:
+        return sep.join(strings)
+    return strings
+
+
+class UnknownUnitsError(KeyError):
+    """Raised when values are given in units that do not exist for their quantity type.
+
+    All unknown units are reported at once:
+    - rows: a mapping of each unknown unit symbol or name on the indices of the rows in which it is used
+    - partial: the batch with all other values converted, and NaN for the rows with unknown units
+    """
+    def __init__(self, rows: dict[str, list[int]], partial: QuantityArray):
+        super().__init__(list(rows))
+        self.rows = rows
+        self.partial = partial
+
+    def __str__(self) -> str:
+        units = ', '.join(f"'{symbol}' ({len(rows)} rows)" for symbol, rows in self.rows.items())
+        return f"Unknown units for {self.partial.quantity_type}: {units}"
+
+
+def normalize(quantity_type: QuantityType, values: Sequence[float], symbols_or_names: Sequence[Optional[str]]) -> QuantityArray:
+    """Return a batch of quantities from values that are each expressed in their own unit.
+
+    The rows are grouped by unit, so that each unit is resolved only once and applied to all values of its group:
+    normalize(Length, [12, 3, 0.5], ['"', "'", 'm']) -> QuantityArray(Length, [0.3048, 0.9144, 0.5])
+
+    If some units do not exist, an UnknownUnitsError is raised listing all of them.
+    """
+    if len(values) != len(symbols_or_names):
+        raise ValueError("Values and units should have the same length")
+    groups: dict[Optional[str], list[int]] = defaultdict(list)
+    for row, symbol_or_name in enumerate(symbols_or_names):
+        groups[symbol_or_name].append(row)
+    result = array('d', [math.nan])*len(values)
+    unknown = {}
+    for symbol_or_name, rows in groups.items():
+        try:
+            unit = quantity_type.unit(symbol_or_name)
+        except KeyError:
+            unknown[symbol_or_name] = rows
+            continue
+        scale, bias = unit.scale, unit.bias
+        for row in rows:
+            result[row] = (values[row] + bias)*scale
+    batch = QuantityArray._from_main_values(quantity_type, result)
+    if unknown:
+        raise UnknownUnitsError(unknown, batch)
+    return batch
@@ -0,0 +1,148 @@
+""" giorgi - caching
+
+This module contains a memoization decorator for functions that take quantities as arguments.
+
+functools.lru_cache cannot be used safely for such functions: quantities are hashed on their exact value
+while they are compared with a tolerance, and comparing quantities of different types raises an error.
+Instead, quantities are replaced in the cache key by their type and their value quantized with a relative tolerance.
+
+E.g.
+@cache(maxsize=1024, rel_tol=1e-6)
+def thermal_conductivity(material: str, temperature: Temperature) -> float:
+    ...
+
+author: Bram Rooseleer
+copyright: Bram Rooseleer
+"""
+
+from collections import OrderedDict, deque
+from functools import wraps
+import math
+from operator import itemgetter
+from threading import Lock
+import time
+from typing import Any, Callable, NamedTuple, Optional
+
+from giorgi.quantities import QuantityType
+
+
+__all__ = ['CacheInfo', 'cache']
+
+
+class CacheInfo(NamedTuple):
+    """Statistics of a cached function."""
+    hits: int
+    misses: int
+    maxsize: Optional[int]
+    currsize: int
+
+
+def _quantizer(rel_tol: float) -> Callable[[float], Any]:
+    """Return a function mapping values on a hashable bucket, in which the values differ at most by the given relative tolerance.
+
+    Values close to the border of a bucket can end up in a different bucket than nearby values.
+    """
+    if rel_tol == 0:
+        return lambda value: value
+    step = math.log1p(rel_tol)
+
+    def quantize(value: float) -> Any:
+        if value == 0 or not math.isfinite(value):
+            return value
+        return math.copysign(1, value), round(math.log(abs(value))/step)
+
+    return quantize
+
+
+def cache(func: Optional[Callable] = None, *, maxsize: Optional[int] = 128, ttl: Optional[float] = None, rel_tol: float = 1e-09) -> Callable:
+    """Decorator that memoizes a function, which can take quantities as arguments.
+
+    Can be used as @cache or with arguments:
+        maxsize: the maximum number of cached results, the least recently used results are evicted first.
+            If None, the cache is unbounded.
+        ttl: if given, the number of seconds after which a cached result expires.
+            Expired results are removed whenever a new result is stored. The expiry bookkeeping is
+            compacted when it holds more than twice the number of cached results.
+        rel_tol: the relative tolerance within which quantity values are considered equal
+
+    Quantities are also quantized inside tuple, list, set and frozenset arguments, but not inside other containers.
+
+    The decorated function has the methods cache_info, which returns a CacheInfo, and cache_clear.
+    It is safe to use from multiple threads.
+    """
+    if func is None:
+        return lambda func: cache(func, maxsize=maxsize, ttl=ttl, rel_tol=rel_tol)
+
+    quantize = _quantizer(rel_tol)
+    results: OrderedDict = OrderedDict()
+    expiries: deque = deque()
+    lock = Lock()
+    hits = misses = 0
+    keyword_marker = object()
+
+    def key_item(arg: Any) -> Any:
+        arg_type = type(arg)
+        if isinstance(arg_type, QuantityType):
+            return arg_type, quantize(arg.value)
+        if arg_type is tuple or arg_type is list:
+            return arg_type, tuple(map(key_item, arg))
+        if arg_type is frozenset or arg_type is set:
+            return arg_type, frozenset(map(key_item, arg))
+        return arg
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        nonlocal hits, misses
+        key = tuple(map(key_item, args))
+        if kwargs:
+            key += (keyword_marker,) + tuple((name, key_item(arg)) for name, arg in kwargs.items())
+        with lock:
+            try:
+                expiry, result = results[key]
+            except KeyError:
+                pass
+            else:
+                if expiry is None or expiry > time.monotonic():
+                    results.move_to_end(key)
+                    hits += 1
+                    return result
+                del results[key]
+            misses += 1
+        result = func(*args, **kwargs)
+        with lock:
+            if ttl is None:
+                expiry = None
+            else:
+                now = time.monotonic()
+                while expiries and expiries[0][0] <= now:
+                    expired, expired_key = expiries.popleft()
+                    if expired_key in results and results[expired_key][0] == expired:
+                        del results[expired_key]
+                expiry = now + ttl
+                expiries.append((expiry, key))
+            results[key] = expiry, result
+            results.move_to_end(key)
+            if maxsize is not None and len(results) > maxsize:
+                results.popitem(last=False)
+            if len(expiries) > 2*len(results):
+                live = sorted(((expiry, key) for key, (expiry, _) in results.items()), key=itemgetter(0))
+                expiries.clear()
+                expiries.extend(live)
+        return result
+
+    def cache_info() -> CacheInfo:
+        """Return the statistics of this cached function."""
+        with lock:
+            return CacheInfo(hits, misses, maxsize, len(results))
+
+    def cache_clear():
+        """Clear the cache and its statistics."""
+        nonlocal hits, misses
+        with lock:
+            results.clear()
+            expiries.clear()
+            hits = misses = 0
+
+    wrapper.cache_info = cache_info
+    wrapper.cache_clear = cache_clear
+    return wrapper
@@ -0,0 +1,148 @@
+""" giorgi - checking
+
+This module contains a decorator to check at runtime that the quantities passed to and returned
+by a function match the quantity types used in its type hints.
+
+E.g.
+@checked
+def speed(distance: Length, duration: Time) -> Speed:
+    return distance/duration
+
+speed(Length(1), Mass(1)) -> TypeError
+
+Only annotations that are quantity types, or unions containing quantity types, are checked; other annotations are ignored.
+Other members of such unions, like None or float for dimensionless values, are allowed as well:
+def f(d: Optional[Length], ratio: Length | float)
+The annotations are inspected once per function, on the first call.
+
+Checking can be globally disabled with set_trusted, in which case decorated functions call
+the original function without any checks.
+
+author: Bram Rooseleer
+copyright: Bram Rooseleer
+"""
+
+from functools import wraps
+import inspect
+import types
+import typing
+from typing import Any, Callable, Optional
+
+from giorgi.quantities import QuantityType
+
+
+__all__ = ['set_trusted', 'is_trusted', 'checked']
+
+
+_trusted: bool = False
+"""Whether checking of quantity types is globally disabled."""
+
+
+def set_trusted(trusted: bool = True):
+    """Globally disable (or re-enable) the checks of functions decorated with checked."""
+    global _trusted
+    _trusted = trusted
+
+
+def is_trusted() -> bool:
+    """Return whether the checks of functions decorated with checked are globally disabled."""
+    return _trusted
+
+
+class _Expected:
+    """The types allowed by an annotation that contains quantity types.
+
+    Quantity types are checked with an identity test on the type. Other members of a union,
+    such as None or float for dimensionless values, are checked with isinstance.
+    """
+    __slots__ = ('quantity_types', 'others', 'names')
+
+    def __init__(self, members: tuple):
+        self.quantity_types = tuple(member for member in members if isinstance(member, QuantityType))
+        others = tuple(member for member in members if not isinstance(member, QuantityType))
+        if float in others:
+            others += (int,)
+        self.others = others
+        self.names = ' | '.join('None' if member is types.NoneType else getattr(member, '__name__', str(member)) for member in members)
+
+    def accepts(self, value: Any) -> bool:
+        """Return whether the given value is of one of the allowed types."""
+        return type(value) in self.quantity_types or isinstance(value, self.others)
+
+
+def _expected(annotation: Any) -> Optional[_Expected]:
+    """Return the types allowed by the given annotation, or None if it does not contain quantity types.
+
+    A union can only be checked when all its members are classes, otherwise it is not checked.
+    """
+    if isinstance(annotation, QuantityType):
+        return _Expected((annotation,))
+    if isinstance(annotation, types.UnionType) or typing.get_origin(annotation) is typing.Union:
+        members = typing.get_args(annotation)
+        if any(isinstance(member, QuantityType) for member in members) and all(isinstance(member, type) for member in members):
+            return _Expected(members)
+    return None
+
+
+class _Validator:
+    """The precomputed checks for the signature of a single function."""
+
+    def __init__(self, func: Callable):
+        hints = typing.get_type_hints(func)
+        self.name = func.__qualname__
+        self.positional: list[tuple[str, Optional[_Expected]]] = []
+        self.keyword: dict[str, _Expected] = {}
+        self.var_positional = None
+        self.var_keyword = None
+        for parameter in inspect.signature(func).parameters.values():
+            expected = _expected(hints.get(parameter.name))
+            if parameter.kind in (parameter.POSITIONAL_ONLY, parameter.POSITIONAL_OR_KEYWORD):
+                self.positional.append((parameter.name, expected))
+            if parameter.kind in (parameter.POSITIONAL_OR_KEYWORD, parameter.KEYWORD_ONLY) and expected is not None:
+                self.keyword[parameter.name] = expected
+            if parameter.kind == parameter.VAR_POSITIONAL:
+                self.var_positional = expected
+            if parameter.kind == parameter.VAR_KEYWORD:
+                self.var_keyword = expected
+        self.returns = _expected(hints.get('return'))
+
+    def _fail(self, description: str, expected: _Expected, value: Any):
+        raise TypeError(f"{description} of {self.name} should be of type {expected.names}, not {type(value).__name__}")
+
+    def check_arguments(self, args: tuple, kwargs: dict):
+        """Raise a TypeError if any of the given arguments does not have the annotated quantity type."""
+        for arg, (name, expected) in zip(args, self.positional):
+            if expected is not None and not expected.accepts(arg):
+                self._fail(f"Argument '{name}'", expected, arg)
+        if self.var_positional is not None:
+            for arg in args[len(self.positional):]:
+                if not self.var_positional.accepts(arg):
+                    self._fail("Positional argument", self.var_positional, arg)
+        for name, arg in kwargs.items():
+            expected = self.keyword.get(name, self.var_keyword)
+            if expected is not None and not expected.accepts(arg):
+                self._fail(f"Argument '{name}'", expected, arg)
+
+    def check_return(self, value: Any):
+        """Raise a TypeError if the given return value does not have the annotated quantity type."""
+        if self.returns is not None and not self.returns.accepts(value):
+            self._fail("Return value", self.returns, value)
+
+
+def checked(func: Callable) -> Callable:
+    """Decorator that checks the quantity types of the arguments and return value of a function against its type hints."""
+    validator = None
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        nonlocal validator
+        if _trusted:
+            return func(*args, **kwargs)
+        if validator is None:
+            validator = _Validator(func)
+        validator.check_arguments(args, kwargs)
+        result = func(*args, **kwargs)
+        validator.check_return(result)
+        return result
+
+    return wrapper
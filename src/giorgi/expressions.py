@@ -0,0 +1,253 @@
+""" giorgi - expressions
+
+This module contains lazy expressions over batches of quantities.
+
+Calculating with batches one operation at a time creates a complete intermediate batch for every operation.
+Instead, operations on lazy expressions only build an expression graph. The quantity type of the result is
+derived from the quantity types of the operands when the graph is built, so that errors are raised immediately.
+When the expression is evaluated, it is compiled into a single function that calculates the result for
+each element in one pass, chunk by chunk.
+
+E.g.
+m, v, h = lazy(masses), lazy(speeds), lazy(heights)
+energy = 0.5*m*v**2 + m*Acceleration(9.81)*h
+energy.quantity_type -> QuantityType('Energy')
+energy.evaluate() -> QuantityArray(Energy, [...])
+
+author: Bram Rooseleer
+copyright: Bram Rooseleer
+"""
+
+from array import array
+from concurrent.futures import Executor
+from functools import lru_cache, partial
+from typing import Callable, Optional, Self
+
+from giorgi.batches import DEFAULT_CHUNK_SIZE, QuantityArray, _default_in_flight, _map_bounded
+from giorgi.quantities import Quantity, QuantityType
+
+
+__all__ = ['Expression', 'lazy']
+
+
+DIMENSIONLESS = float
+"""The type used for dimensionless values, as returned by QuantityType algebra."""
+
+
+def _multiply_types(a: QuantityType | type, b: QuantityType | type) -> QuantityType | type:
+    """Return the quantity type of the multiplication of values of the given types."""
+    if a is DIMENSIONLESS:
+        return b
+    if b is DIMENSIONLESS:
+        return a
+    return a*b
+
+
+def _divide_types(a: QuantityType | type, b: QuantityType | type) -> QuantityType | type:
+    """Return the quantity type of the division of values of the given types."""
+    if b is DIMENSIONLESS:
+        return a
+    if a is DIMENSIONLESS:
+        return 1/b
+    return a/b
+
+
+class _Compilation:
+    """The state while compiling an expression graph to Python source code."""
+
+    def __init__(self):
+        self.inputs: dict[int, tuple[str, array]] = {}
+        self.namespace: dict[str, float] = {}
+
+    def input(self, values: array) -> str:
+        """Return the variable name for the given input, the same input always gets the same name."""
+        try:
+            return self.inputs[id(values)][0]
+        except KeyError:
+            name = f"x{len(self.inputs)}"
+            self.inputs[id(values)] = name, values
+            return name
+
+    def constant(self, value: float) -> str:
+        """Return the variable name for the given constant."""
+        name = f"c{len(self.namespace)}"
+        self.namespace[name] = value
+        return name
+
+
+class Expression:
+    """Abstract class for lazy expressions over batches of quantities.
+
+    Supported operations are the same as for quantities:
+    * unary -
+    * binary - and +: only between expressions of the same quantity type
+    * *, /: between expressions, quantities, floats or ints
+    * **: only between an expression and an int
+    """
+
+    quantity_type: QuantityType | type
+    """The quantity type of the result of this expression, float if it is dimensionless."""
+
+    def _source(self, compilation: _Compilation) -> str:
+        """Return Python source code calculating this expression for a single element."""
+        raise NotImplementedError()
+
+    def __repr__(self) -> str:
+        """Return a representation of this expression."""
+        return f"Expression('{self._source(_Compilation())}', {self.quantity_type.__name__})"
+
+    def __neg__(self) -> Self:
+        return _Operation('-', (self,), self.quantity_type)
+
+    def __add__(self, other) -> Self:
+        other = _wrap(other)
+        if self.quantity_type is not other.quantity_type:
+            raise TypeError("Can only add quantities of same type together")
+        return _Operation('+', (self, other), self.quantity_type)
+
+    def __radd__(self, other) -> Self:
+        return _wrap(other) + self
+
+    def __sub__(self, other) -> Self:
+        other = _wrap(other)
+        if self.quantity_type is not other.quantity_type:
+            raise TypeError("Can only subtract quantities of same type")
+        return _Operation('-', (self, other), self.quantity_type)
+
+    def __rsub__(self, other) -> Self:
+        return _wrap(other) - self
+
+    def __mul__(self, other) -> Self:
+        other = _wrap(other)
+        return _Operation('*', (self, other), _multiply_types(self.quantity_type, other.quantity_type))
+
+    def __rmul__(self, other) -> Self:
+        return _wrap(other)*self
+
+    def __truediv__(self, other) -> Self:
+        other = _wrap(other)
+        return _Operation('/', (self, other), _divide_types(self.quantity_type, other.quantity_type))
+
+    def __rtruediv__(self, other) -> Self:
+        return _wrap(other)/self
+
+    def __pow__(self, exponent: int) -> Self:
+        if not isinstance(exponent, int):
+            raise TypeError("Quantities can only be raised to an integer power")
+        quantity_type = DIMENSIONLESS if self.quantity_type is DIMENSIONLESS else self.quantity_type**exponent
+        return _Operation('**', (self, _Constant(exponent, DIMENSIONLESS)), quantity_type)
+
+    def compile(self) -> tuple[Callable[[list[array]], list[float]], list[array]]:
+        """Return a function calculating this expression for chunks of its inputs, and the inputs.
+
+        The function takes a list with a chunk of each input and returns the list of results.
+        It can be pickled, so it can be used with a ProcessPoolExecutor.
+        """
+        compilation = _Compilation()
+        source = self._source(compilation)
+        if not compilation.inputs:
+            raise ValueError("Cannot evaluate an expression without batches")
+        names, inputs = zip(*compilation.inputs.values())
+        source = f"lambda {', '.join(names)}: [{source} for {', '.join(names)}, in zip({', '.join(names)})]"
+        return partial(_evaluate_chunk, source, tuple(compilation.namespace.items())), list(inputs)
+
+    def evaluate(
+            self,
+            chunk_size: int = DEFAULT_CHUNK_SIZE,
+            executor: Optional[Executor] = None,
+            in_flight: Optional[int] = None,
+        ) -> QuantityArray | array:
+        """Return the result of this expression as a batch, or an array of floats if it is dimensionless.
+
+        The inputs are handled in chunks of the given size, so intermediate results are never created for whole batches.
+        If an executor is given, the chunks are spread over it, with at most in_flight chunks submitted
+        at any time (twice the number of CPUs if None). As the chunks are calculated in pure Python,
+        only a ProcessPoolExecutor makes the evaluation faster; in a ThreadPoolExecutor they hold the GIL.
+        """
+        function, inputs = self.compile()
+        length = len(inputs[0])
+        if any(len(values) != length for values in inputs):
+            raise ValueError("All batches in an expression should have the same length")
+        chunks = ([values[start:start + chunk_size] for values in inputs] for start in range(0, length, chunk_size))
+        result = array('d')
+        if executor is None:
+            for chunk in chunks:
+                result.extend(function(chunk))
+        else:
+            for chunk_result in _map_bounded(executor, function, chunks, in_flight or _default_in_flight()):
+                result.extend(chunk_result)
+        if self.quantity_type is DIMENSIONLESS:
+            return result
+        return QuantityArray._from_main_values(self.quantity_type, result)
+
+
+@lru_cache(maxsize=64)
+def _compile_source(source: str, constants: tuple[tuple[str, float], ...]) -> Callable[..., list[float]]:
+    """Return the function defined by the given lambda source, with the given constants as globals."""
+    return eval(source, dict(constants))
+
+
+def _evaluate_chunk(source: str, constants: tuple[tuple[str, float], ...], chunk: list[array]) -> list[float]:
+    """Return the results of the compiled expression for a chunk of each of its inputs.
+
+    This is a module-level function, so that it can be sent to worker processes. The source is
+    compiled at most once per process.
+    """
+    return _compile_source(source, constants)(*chunk)
+
+
+class _Input(Expression):
+    """An expression that is a batch of quantities."""
+
+    def __init__(self, quantities: QuantityArray):
+        self.values = quantities.values
+        self.quantity_type = quantities.quantity_type
+
+    def _source(self, compilation: _Compilation) -> str:
+        return compilation.input(self.values)
+
+
+class _Constant(Expression):
+    """An expression that is a single quantity or number."""
+
+    def __init__(self, value: float, quantity_type: QuantityType | type):
+        self.value = value
+        self.quantity_type = quantity_type
+
+    def _source(self, compilation: _Compilation) -> str:
+        if isinstance(self.value, int):
+            return repr(self.value)
+        return compilation.constant(self.value)
+
+
+class _Operation(Expression):
+    """An expression that is an operation on other expressions."""
+
+    def __init__(self, operator: str, operands: tuple[Expression, ...], quantity_type: QuantityType | type):
+        self.operator = operator
+        self.operands = operands
+        self.quantity_type = quantity_type
+
+    def _source(self, compilation: _Compilation) -> str:
+        if len(self.operands) == 1:
+            return f"({self.operator}{self.operands[0]._source(compilation)})"
+        left, right = self.operands
+        return f"({left._source(compilation)} {self.operator} {right._source(compilation)})"
+
+
+def _wrap(value: Expression | QuantityArray | Quantity | int | float) -> Expression:
+    """Return the given value as an expression."""
+    if isinstance(value, Expression):
+        return value
+    if isinstance(value, QuantityArray):
+        return _Input(value)
+    if isinstance(value, Quantity):
+        return _Constant(value.value, type(value))
+    if isinstance(value, (int, float)):
+        return _Constant(float(value), DIMENSIONLESS)
+    raise TypeError(f"Cannot use {type(value).__name__} in an expression")
+
+
+def lazy(quantities: QuantityArray) -> Expression:
+    """Return a lazy expression for the given batch, to build an expression graph with."""
+    return _wrap(quantities)
@@ -0,0 +1,131 @@
+""" giorgi - indices
+
+This module contains a sorted index for quantities of a single quantity type, which supports
+fast ordering, range and nearest-neighbour queries.
+
+The comparison operators of quantities are tolerance-aware and check the types of both operands,
+which makes them relatively expensive when used for sorting or searching large numbers of quantities.
+The index instead works directly on the values in the main unit.
+
+author: Bram Rooseleer
+copyright: Bram Rooseleer
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right, insort
+import math
+from operator import attrgetter
+from typing import Callable, Iterable, Iterator, Self
+
+from giorgi.batches import QuantityArray, format_many
+from giorgi.quantities import Quantity, QuantityType
+
+
+__all__ = ['sort_key', 'QuantityIndex']
+
+
+sort_key: Callable[[Quantity], float] = attrgetter('value')
+"""A key function to sort quantities of the same type without using the comparison operators.
+
+E.g.
+sorted(lengths, key=sort_key)
+"""
+
+
+class QuantityIndex:
+    """A sorted collection of quantities of the same quantity type.
+
+    The values are stored in a sorted float64 array, expressed in the main unit of the quantity type.
+
+    E.g.
+    index = QuantityIndex(Length, [Length(3, 'km'), Length(1, 'mi'), Length(10, 'km')])
+    index.between(Length(1, 'km'), Length(5, 'mi')) -> QuantityArray(Length, [1609.344, 3000.0])
+    """
+    def __init__(self, quantity_type: QuantityType, quantities: Iterable[Quantity] = ()):
+        """Create an index for the given quantity type, containing the given quantities."""
+        self.quantity_type = quantity_type
+        self.values = array('d', sorted(self._value(quantity) for quantity in quantities))
+
+    @classmethod
+    def from_array(cls, quantities: QuantityArray) -> Self:
+        """Create an index containing the quantities of the given batch."""
+        index = cls(quantities.quantity_type)
+        index.values = array('d', sorted(quantities.values))
+        return index
+
+    def _value(self, quantity: Quantity) -> float:
+        """Return the value of the given quantity, after checking its type."""
+        if type(quantity) is not self.quantity_type:
+            raise TypeError(f"Can only use quantities of type {self.quantity_type} with this index")
+        return quantity.value
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __getitem__(self, index: int | slice) -> Quantity | QuantityArray:
+        """Return the quantity at the given position in the sorted order, or a batch for a slice."""
+        if isinstance(index, slice):
+            return QuantityArray._from_main_values(self.quantity_type, self.values[index])
+        return self.quantity_type(self.values[index])
+
+    def __iter__(self) -> Iterator[Quantity]:
+        quantity_type = self.quantity_type
+        return (quantity_type(value) for value in self.values)
+
+    def __contains__(self, quantity: Quantity) -> bool:
+        """Return whether a quantity equal to the given quantity is in the index. Small numerical inaccuracies are ignored."""
+        value = self._value(quantity)
+        position = bisect_left(self.values, value)
+        return any(
+            math.isclose(self.values[i], value)
+                for i in (position - 1, position)
+                if 0 <= i < len(self.values)
+        )
+
+    def __repr__(self) -> str:
+        """Return a representation of this index."""
+        return f"QuantityIndex({self.quantity_type}, {len(self)} values)"
+
+    def add(self, quantity: Quantity):
+        """Add the given quantity to the index."""
+        insort(self.values, self._value(quantity))
+
+    def format(self, symbol_or_name=None, float_fmt: str = '.3f', **kwargs) -> list[str] | str:
+        """Return string representations of the values in this index, in sorted order. See format_many."""
+        return format_many(self, symbol_or_name, float_fmt, **kwargs)
+
+    def to_array(self) -> QuantityArray:
+        """Return the quantities of this index, in sorted order, as a batch."""
+        return QuantityArray._from_main_values(self.quantity_type, array('d', self.values))
+
+    def between(self, low: Quantity, high: Quantity) -> QuantityArray:
+        """Return the quantities q of this index for which low <= q <= high, in sorted order, as a batch.
+
+        Contrary to the comparison operators, the bounds are compared exactly.
+        """
+        start = bisect_left(self.values, self._value(low))
+        stop = bisect_right(self.values, self._value(high))
+        return QuantityArray._from_main_values(self.quantity_type, self.values[start:stop])
+
+    def nearest(self, quantity: Quantity) -> Quantity:
+        """Return the quantity of this index that is nearest to the given quantity."""
+        if not self.values:
+            raise ValueError("Cannot search an empty index")
+        value = self._value(quantity)
+        position = bisect_left(self.values, value)
+        candidates = self.values[max(position - 1, 0):position + 1]
+        return self.quantity_type(min(candidates, key=lambda candidate: abs(candidate - value)))
+
+    def deduplicated(self, rel_tol: float = 1e-09, abs_tol: float = 0.0) -> Self:
+        """Return a new index in which quantities that are equal within the given tolerances are only kept once.
+
+        The tolerances have the same meaning as for math.isclose, the defaults match the comparison of quantities.
+        Of each group of equal quantities, the smallest one is kept.
+        """
+        values = array('d')
+        for value in self.values:
+            if not values or not math.isclose(values[-1], value, rel_tol=rel_tol, abs_tol=abs_tol):
+                values.append(value)
+        index = type(self)(self.quantity_type)
+        index.values = values
+        return index
@@ -104,6 +104,8 @@ class Quantity:
         
         Only quantities of the same type can be added.
         """
+        if not isinstance(other, (Quantity, int, float)):
+            return NotImplemented
         if type(self) != type(other):
             raise TypeError("Can only add quantities of same type together")
         return type(self)(self.value + other.value)
@@ -122,8 +124,9 @@ class Quantity:
         """
         if isinstance(other, (int, float)):
             return type(self)(self.value*other)
-        else:
+        elif isinstance(other, Quantity):
             return (type(self)*type(other))(self.value*other.value)
+        return NotImplemented
     
     def __rmul__(self, other: int | float) -> Self:
         """Return a quantity that represents the multiplication of this quantity and a numerical value."""
@@ -135,8 +138,9 @@ class Quantity:
         """
         if isinstance(other, (int, float)):
             return type(self)(self.value/other)
-        else:
+        elif isinstance(other, Quantity):
             return (type(self)/type(other))(self.value/other.value)
+        return NotImplemented
     
     def __rtruediv__(self, other: int | float) -> Self:
         """Return a quantity that represents the division of this quantity and a numerical value."""        
@@ -177,25 +181,25 @@ class Quantity:
         """Return whether this quantity is smaller than the given quantity."""
         if type(self) != type(other):
             raise TypeError()
-        return self.value < other.value and self != other
+        return self.value < other.value and not math.isclose(self.value, other.value)
     
     def __le__(self, other: Self) -> bool:
         """Return whether this quantity is smaller than or equal to the given quantity."""
         if type(self) != type(other):
             raise TypeError()
-        return self.value <= other.value or self == other
+        return self.value <= other.value or math.isclose(self.value, other.value)
     
     def __gt__(self, other: Self) -> bool:
         """Return whether this quantity is bigger than the given quantity."""
         if type(self) != type(other):
             raise TypeError()
-        return self.value > other.value and self != other
+        return self.value > other.value and not math.isclose(self.value, other.value)
     
     def __ge__(self, other: Self) -> bool:
         """Return whether this quantity is bigger than or equal to the given quantity."""
         if type(self) != type(other):
             raise TypeError()
-        return self.value >= other.value or self == other
+        return self.value >= other.value or math.isclose(self.value, other.value)
     
     
 class QuantityType(type):
@@ -0,0 +1,188 @@
+""" giorgi - schemas
+
+This module contains schemas, which describe records with a quantity per field and parse
+them into one batch of quantities per field.
+
+E.g.
+schema = Schema(temp=(Temperature, '°C'), p=(Pressure, 'bar'), flow=(VolumetricFlowRate, 'l/min'))
+columns = schema.parse([{'temp': '21.4 °C', 'p': '1.013 bar', 'flow': 3}])
+columns['temp'][0] -> 294.550 K
+
+author: Bram Rooseleer
+copyright: Bram Rooseleer
+"""
+
+from array import array
+import csv
+from collections.abc import Mapping
+from itertools import islice
+from operator import itemgetter
+import re
+from typing import Callable, Iterable, Optional, TextIO
+
+from giorgi.batches import DEFAULT_CHUNK_SIZE, QuantityArray
+from giorgi.quantities import QuantityType
+
+
+__all__ = ['Schema']
+
+
+_VALUE_AND_SYMBOL = re.compile(r'\s*([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?|[-+]?(?:inf|nan))\s*(.*?)\s*$', re.IGNORECASE)
+"""A pattern splitting a string in a number and a unit symbol, which do not need to be separated by a space."""
+
+_VALUES_AND_SYMBOLS = re.compile(r'^[^\S\n]*([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?|[-+]?(?:inf|nan))[^\S\n]*([^\n]*?)[^\S\n]*$', re.IGNORECASE | re.MULTILINE)
+"""The same pattern as _VALUE_AND_SYMBOL, matching each line of a multiline string."""
+
+
+def _row_getter(keys: list) -> Callable:
+    """Return a function that returns a tuple with the items of a row for the given keys."""
+    if len(keys) == 1:
+        key, = keys
+        return lambda row: (row[key],)
+    return itemgetter(*keys)
+
+
+class _FieldConverter:
+    """Converts values of a single field to the main unit of its quantity type.
+
+    Numbers are interpreted in the unit of the field. Strings can contain a unit symbol or name
+    after the number, otherwise the unit of the field is used as well.
+    """
+    def __init__(self, quantity_type: QuantityType, symbol_or_name=None):
+        unit = quantity_type.unit(symbol_or_name)
+        self.quantity_type = quantity_type
+        self.scale, self.bias = unit.scale, unit.bias
+        self._units: dict[str, tuple[float, float]] = {'': (unit.scale, unit.bias)}
+
+    def _unit(self, symbol: str) -> tuple[float, float]:
+        """Return the scale and bias of the unit with the given symbol or name, where '' means the unit of the field."""
+        try:
+            return self._units[symbol]
+        except KeyError:
+            unit = self.quantity_type.unit(symbol.strip())
+            self._units[symbol] = unit.scale, unit.bias
+            return self._units[symbol]
+
+    def __call__(self, cell: float | str) -> float:
+        """Return the given value in the main unit."""
+        if not isinstance(cell, str):
+            return (cell + self.bias)*self.scale
+        number, _, symbol = cell.strip().partition(' ')
+        try:
+            value = float(number)
+        except ValueError:
+            match = _VALUE_AND_SYMBOL.match(cell)
+            if match is None:
+                raise ValueError(f"Cannot parse '{cell}' as a {self.quantity_type}") from None
+            number, symbol = match.groups()
+            value = float(number)
+        scale, bias = self._unit(symbol)
+        return (value + bias)*scale
+
+    def convert_many(self, cells: Iterable[float | str]) -> array:
+        """Return an array with the given values in the main unit.
+
+        Values are parsed in one go when they are all plain numbers, or all strings with the same unit.
+        In the latter case, the strings are split on the first space. Only if a number and its unit are
+        not separated by a space, all strings are split with a single regular expression search instead.
+        Otherwise they are converted one by one.
+        """
+        scale, bias = self.scale, self.bias
+        try:
+            values = array('d', map(float, cells))
+        except ValueError:
+            try:
+                values, symbols = self._split(cells)
+            except (TypeError, ValueError):
+                return array('d', map(self, cells))
+            symbols = set(symbols)
+            if len(symbols) != 1:
+                return array('d', map(self, cells))
+            scale, bias = self._unit(symbols.pop())
+        if scale != 1 or bias != 0:
+            values = array('d', [(value + bias)*scale for value in values])
+        return values
+
+    @staticmethod
+    def _split(cells: tuple[str, ...]) -> tuple[array, Iterable[str]]:
+        """Return the numerical values and the unit symbols of the given strings.
+
+        Raises a ValueError or TypeError if not all cells are strings with a number and an optional unit.
+        """
+        try:
+            parts = [cell.strip().partition(' ') for cell in cells]
+        except AttributeError:
+            raise TypeError("Not all cells are strings") from None
+        try:
+            values = array('d', [float(number) for number, _, _ in parts])
+        except ValueError:
+            text = '\n'.join(cells)
+            matches = _VALUES_AND_SYMBOLS.findall(text)
+            if len(matches) != len(cells) or text.count('\n') != len(cells) - 1:
+                raise ValueError("Not all cells start with a number") from None
+            numbers, symbols = zip(*matches)
+            return array('d', map(float, numbers)), symbols
+        return values, [symbol for _, _, symbol in parts]
+
+
+class Schema:
+    """A description of records consisting of named quantities.
+
+    Each field is given as a keyword argument, with as value either a quantity type or a tuple of a
+    quantity type and the unit in which numerical values for that field are expressed.
+    """
+    def __init__(self, **fields: QuantityType | tuple[QuantityType, Optional[str]]):
+        self.fields: dict[str, tuple[QuantityType, Optional[str]]] = {
+            name: field if isinstance(field, tuple) else (field, None)
+                for name, field in fields.items()
+        }
+        self._converters = [_FieldConverter(quantity_type, symbol_or_name) for quantity_type, symbol_or_name in self.fields.values()]
+
+    def __repr__(self) -> str:
+        """Return a representation of this schema."""
+        fields = ', '.join(f"{name}=({quantity_type}, {symbol_or_name!r})" for name, (quantity_type, symbol_or_name) in self.fields.items())
+        return f"Schema({fields})"
+
+    def parse(self, rows: Iterable[Mapping | tuple | list], chunk_size: int = DEFAULT_CHUNK_SIZE) -> dict[str, QuantityArray]:
+        """Parse the given rows into a batch of quantities per field.
+
+        Rows can be mappings from field names to values, or sequences with a value per field,
+        in the order of the fields of the schema. All rows should be of the same kind.
+        Values can be numbers, or strings with a number and optionally a unit.
+
+        The rows are handled in chunks of the given size, in which each field is converted as a whole.
+        """
+        names = list(self.fields)
+        getter = _row_getter(names)
+        columns = [array('d') for _ in names]
+        rows = iter(rows)
+        while chunk := list(islice(rows, chunk_size)):
+            if isinstance(chunk[0], Mapping):
+                chunk = list(map(getter, chunk))
+            if any(length != len(names) for length in set(map(len, chunk))):
+                raise ValueError(f"Expected {len(names)} values per row")
+            for column, converter, cells in zip(columns, self._converters, zip(*chunk)):
+                column.extend(converter.convert_many(cells))
+        return {
+            name: QuantityArray._from_main_values(quantity_type, column)
+                for (name, (quantity_type, _)), column in zip(self.fields.items(), columns)
+        }
+
+    def parse_csv(self, file: TextIO | Iterable[str], header: bool = True, **fmtparams) -> dict[str, QuantityArray]:
+        """Parse CSV data into a batch of quantities per field.
+
+        If header is True, the first row should contain the field names and columns are matched by name,
+        otherwise the columns should be in the order of the fields of the schema.
+        Empty lines are skipped. Additional keyword arguments are passed to csv.reader.
+        """
+        reader = filter(None, csv.reader(file, **fmtparams))
+        if not header:
+            return self.parse(reader)
+        header_row = next(reader, [])
+        try:
+            indices = [header_row.index(name) for name in self.fields]
+        except ValueError:
+            raise ValueError(f"CSV header {header_row} does not contain all fields {list(self.fields)}") from None
+        if indices == list(range(len(header_row))):
+            return self.parse(reader)
+        return self.parse(map(_row_getter(indices), reader))